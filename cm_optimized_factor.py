@@ -4,140 +4,186 @@ Optimized CM Factorization for D*V^2+1 construction
 This is an improved version that uses more advanced techniques for factorization.
 """
 
+import os
+import sys
+import multiprocessing
 import random
 import math
 import time
-from typing import Optional, Tuple, List
-from Crypto.Util.number import getRandomInteger, getPrime, isPrime
-from sympy import factorint, gcd
+from math import isqrt
+from typing import Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from Crypto.Util.number import getRandomInteger, getPrime
+from sympy import sieve
 import argparse
+import gmpy2
+from gmpy2 import mpz, gcd
 
 
-def isqrt(n):
-    """Integer square root"""
-    if n < 0:
-        raise ValueError("Square root of negative number")
-    if n == 0:
-        return 0
-    x = n
-    y = (x + 1) // 2
-    while y < x:
-        x = y
-        y = (x + n // x) // 2
-    return x
+# Primes below 10^6 for trial division, and the product of the first 6542 of
+# them (every prime below 2^16) for a single-gcd small factor test
+SMALL_PRIMES = tuple(sieve.primerange(2, 10**6))
+PRIMORIAL_COUNT = 6542
+PRIMORIAL = mpz(math.prod(SMALL_PRIMES[:PRIMORIAL_COUNT]))
 
+# Above this size Pollard's rho is hopeless against CM semiprimes
+RHO_MAX_BITS = 200
 
-def miller_rabin_is_prime(n: int, k: int = 10) -> bool:
-    """Miller-Rabin primality test"""
-    if n < 2:
-        return False
-    if n == 2 or n == 3:
-        return True
-    if n % 2 == 0:
-        return False
-    
-    r = 0
-    d = n - 1
-    while d % 2 == 0:
-        r += 1
-        d //= 2
+
+def miller_rabin_is_prime(n: int) -> bool:
+    """Primality test (GMP BPSW, no known counterexamples)"""
+    return bool(gmpy2.is_prime(mpz(n)))
+
+
+def _brent_rho(n: mpz, c: int, y: mpz, max_iterations: int) -> Optional[int]:
+    """One Pollard's rho run with Brent's cycle detection for f(x) = x^2 + c"""
+    m = 128  # Steps accumulated into q between gcd calls
+    g, r, q = 1, 1, 1
     
-    for _ in range(k):
-        a = random.randrange(2, n - 1)
-        x = pow(a, d, n)
+    while g == 1 and r <= max_iterations:
+        x = y
+        for _ in range(r):
+            y = (y * y + c) % n
         
-        if x == 1 or x == n - 1:
-            continue
-            
-        for _ in range(r - 1):
-            x = pow(x, 2, n)
-            if x == n - 1:
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            for _ in range(min(m, r - k)):
+                y = (y * y + c) % n
+                q = q * abs(x - y) % n
+                if not q:
+                    # y met x (or the product vanished mod n): the rest of the
+                    # batch is wasted, so stop and recover from ys below
+                    break
+            g = gcd(q, n)
+            k += m
+        
+        r *= 2
+    
+    if g == n:
+        # The batch overshot, walk back from ys one step at a time; the
+        # culprit lies within one batch, so the walk is bounded by m
+        for _ in range(m):
+            ys = (ys * ys + c) % n
+            g = gcd(abs(x - ys), n)
+            if g > 1:
                 break
-        else:
-            return False
     
-    return True
+    if g != 1 and g != n:
+        return int(g)
+    
+    return None
 
 
 def pollard_rho(n: int, max_iterations: int = 100000) -> Optional[int]:
-    """Pollard's rho algorithm with cycle detection"""
+    """Pollard's rho algorithm with Brent's cycle detection"""
     if n % 2 == 0:
         return 2
     
+    # GMP's mpz multiply/reduce is markedly cheaper than PyLong for the hot loop
+    n = mpz(n)
+    
     for c in range(1, 10):  # Try different c values
-        x = random.randint(2, n - 2)
-        y = x
-        d = 1
-        
-        for _ in range(max_iterations):
-            x = (x * x + c) % n
-            y = (y * y + c) % n
-            y = (y * y + c) % n
-            
-            d = gcd(abs(x - y), n)
-            
-            if d != 1 and d != n:
-                return d
+        factor = _brent_rho(n, c, mpz(random.randint(2, n - 2)), max_iterations)
+        if factor:
+            return factor
     
     return None
 
 
 def trial_division(n: int, limit: int = 1000000) -> Optional[int]:
-    """Trial division up to limit"""
-    if n % 2 == 0:
-        return 2
+    """Trial division by the tabulated primes up to limit (at most 10^6)"""
+    bound = min(limit, isqrt(n) + 1)
     
-    for i in range(3, min(limit, int(math.sqrt(n)) + 1), 2):
-        if n % i == 0:
-            return i
+    # One gcd against the primorial rules out every prime below 2^16 at once
+    start = 0 if gcd(n, PRIMORIAL) != 1 else PRIMORIAL_COUNT
+    
+    for p in SMALL_PRIMES[start:]:
+        if p >= bound:
+            break
+        if n % p == 0:
+            return p
     
     return None
 
 
-def construct_with_known_structure(D: int, v_bits: int, q_bits: int, verbose: bool = False) -> Tuple[int, int, int, int]:
-    """Construct a number using the exact structure from the problem statement"""
-    max_attempts = 1000
+def _construct_attempts(D: int, v_bits: int, attempts: int) -> Optional[Tuple[int, int, int]]:
+    """
+    Run a batch of construction attempts, for use in a process pool
+    Returns (p, V, attempts used) for the first prime p found
+    """
+    D_mpz = mpz(D)
     
-    for attempt in range(max_attempts):
+    for attempt in range(attempts):
         # Generate V as specified
         V = getRandomInteger(v_bits)
         if V % 2 == 0:
             V += 1  # Ensure V is odd for D ≡ 3 (mod 8)
         
-        # Calculate numbers = D * V^2 + 1
-        numbers = D * V * V + 1
+        # numbers = D * V^2 + 1 is always ≡ 0 (mod 4) here, so the
+        # problem statement's numbers % 4 check can never fail
+        p = int((D_mpz * gmpy2.square(V) + 1) >> 2)
         
-        # Check the condition from the problem statement
-        if numbers % 4 == 0:
-            p = numbers // 4
-            
-            # Check if p is prime
-            if p.bit_length() < 512:
-                is_prime_p = miller_rabin_is_prime(p, 20)
-            else:
-                is_prime_p = isPrime(p)
+        # One gcd against the primorial rejects most composites before the
+        # far more expensive primality test
+        if p >= 1 << 16 and gcd(p, PRIMORIAL) != 1:
+            continue
+        
+        # Check if p is prime
+        if miller_rabin_is_prime(p):
+            return p, V, attempt + 1
+    
+    return None
+
+
+def construct_with_known_structure(D: int, v_bits: int, q_bits: int, verbose: bool = False) -> Tuple[int, int, int, int]:
+    """Construct a number using the exact structure from the problem statement"""
+    if D % 8 != 3:
+        raise ValueError('D must be congruent to 3 modulo 8')
+    
+    max_attempts = 1000
+    batch_size = 25
+    attempts = 0
+    
+    # Candidates are independent, so batches of attempts run across processes
+    # and the first prime p found wins
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        pending = {executor.submit(_construct_attempts, D, v_bits, batch_size)
+                   for _ in range(max_attempts // batch_size)}
+        
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
             
-            if is_prime_p:
+            for future in done:
+                result = future.result()
+                if result is None:
+                    attempts += batch_size
+                    if verbose and attempts % 100 == 0:
+                        print(f"  Attempt {attempts}...")
+                    continue
+                
+                executor.shutdown(cancel_futures=True)
+                p, V, used = result
+                attempts += used
+                
                 # Generate q as specified
                 q = getPrime(q_bits)
                 n = p * q
                 
                 if verbose:
-                    print(f"Successfully constructed after {attempt + 1} attempts:")
+                    print(f"Successfully constructed after {attempts} attempts:")
                     print(f"  V = {V} ({V.bit_length()} bits)")
                     print(f"  p = (D*V^2+1)/4 = {p} ({p.bit_length()} bits)")
                     print(f"  q = {q} ({q.bit_length()} bits)")
                     print(f"  n = p*q = {n} ({n.bit_length()} bits)")
                 
                 return n, p, q, V
-                
-        if verbose and attempt % 100 == 0 and attempt > 0:
-            print(f"  Attempt {attempt}...")
     
     raise ValueError(f"Could not construct number after {max_attempts} attempts")
 
 
-def smart_cm_factorization(n: int, D: int, verbose: bool = False) -> Optional[Tuple[int, int]]:
+def smart_cm_factorization(n: int, D: int, verbose: bool = False, use_rho: bool = True,
+                           v_bits_step: int = 16) -> Optional[Tuple[int, int]]:
     """
     Smart factorization for numbers of the form p*q where p = (D*V^2+1)/4
     """
@@ -150,17 +196,23 @@ def smart_cm_factorization(n: int, D: int, verbose: bool = False) -> Optional[Tu
         return small_factor, n // small_factor
     
     # Strategy 2: Try Pollard's rho
-    if verbose:
-        print("Trying Pollard's rho...")
-    
-    rho_factor = pollard_rho(n, 100000)
-    if rho_factor:
+    if use_rho:
         if verbose:
-            print(f"Pollard's rho found factor: {rho_factor}")
-        return rho_factor, n // rho_factor
+            print("Trying Pollard's rho...")
+        
+        rho_factor = pollard_rho(n, 100000)
+        if rho_factor:
+            if verbose:
+                print(f"Pollard's rho found factor: {rho_factor}")
+            return rho_factor, n // rho_factor
     
     # Strategy 3: Use the fact that one factor has the form (D*V^2+1)/4
-    # We can search for V values that might work
+    # We can search for V values that might work. D*V^2+1 (mod 4) depends only
+    # on D mod 4 and V mod 2, and vanishes exactly for D ≡ 3 (mod 4) and odd V,
+    # so the divisibility check is settled here rather than per candidate
+    if D % 4 != 3:
+        return None
+    
     if verbose:
         print("Searching for V values...")
     
@@ -168,39 +220,48 @@ def smart_cm_factorization(n: int, D: int, verbose: bool = False) -> Optional[Tu
     n_bits = n.bit_length()
     estimated_v_bits = n_bits // 4  # Very rough estimate
     
+    # Keep the per-candidate arithmetic in GMP
+    n_mpz = mpz(n)
+    D_mpz = mpz(D)
+    
     # Try different V bit sizes around the estimate
-    for v_bits in range(max(64, estimated_v_bits - 64), estimated_v_bits + 64, 16):
+    for v_bits in range(max(64, estimated_v_bits - 64), estimated_v_bits + 64, v_bits_step):
         if verbose:
             print(f"  Trying V with {v_bits} bits...")
         
         # For each bit size, try a limited number of V values
-        v_min = 1 << (v_bits - 1)
-        v_max = (1 << v_bits) - 1
+        top_bit = 1 << (v_bits - 1)
         
         for _ in range(1000):  # Try 1000 random V values
-            V = random.randrange(v_min, v_max)
-            if V % 2 == 0:
-                V += 1  # Make odd
+            # Exactly v_bits wide and odd, without randrange's range sizing
+            V = random.getrandbits(v_bits) | top_bit | 1
             
             # Calculate the corresponding p
-            numbers = D * V * V + 1
-            if numbers % 4 == 0:
-                p = numbers // 4
-                
-                # Check if p divides n
-                if n % p == 0:
-                    q = n // p
-                    if verbose:
-                        print(f"Found factorization: {n} = {p} * {q}")
-                        print(f"Where p = (D*{V}^2+1)/4")
-                    return p, q
+            p = (D_mpz * gmpy2.square(V) + 1) >> 2
+            
+            # Check if p divides n
+            if n_mpz % p == 0:
+                p = int(p)
+                q = n // p
+                if verbose:
+                    print(f"Found factorization: {n} = {p} * {q}")
+                    print(f"Where p = (D*{V}^2+1)/4")
+                return p, q
     
     return None
 
 
-def enhanced_cm_search(n: int, D: int, verbose: bool = False) -> Optional[Tuple[int, int]]:
+def _rho_worker(n: int, c: int, iterations: int, seed: int) -> Optional[int]:
+    """Single Pollard's rho run with constant c, for use in a process pool"""
+    rng = random.Random(seed)
+    n = mpz(n)
+    return _brent_rho(n, c, mpz(rng.randint(2, n - 2)), iterations)
+
+
+def enhanced_cm_search(n: int, D: int, verbose: bool = False, stop=None) -> Optional[Tuple[int, int]]:
     """
     Enhanced search using mathematical properties of CM construction
+    Gives up early once the optional stop event is set
     """
     if verbose:
         print("Enhanced CM search...")
@@ -213,37 +274,46 @@ def enhanced_cm_search(n: int, D: int, verbose: bool = False) -> Optional[Tuple[
     potential_factors = []
     
     # Add some factors found by trial division
-    for i in range(3, min(100000, int(math.sqrt(n)) + 1), 2):
+    bound = min(100000, isqrt(n) + 1)
+    start = 0 if gcd(n, PRIMORIAL) != 1 else PRIMORIAL_COUNT
+    for i in SMALL_PRIMES[start:]:
+        if i >= bound:
+            break
         if n % i == 0:
             potential_factors.append(i)
             potential_factors.append(n // i)
     
-    # Add factors from Pollard's rho with different parameters
-    for c in range(1, 20):
-        x = random.randint(2, n - 2)
-        y = x
-        d = 1
-        
-        for _ in range(10000):
-            x = (x * x + c) % n
-            y = (y * y + c) % n
-            y = (y * y + c) % n
-            
-            d = gcd(abs(x - y), n)
+    # Add factors from Pollard's rho with different parameters; the restarts
+    # are independent, so run them across processes and keep the first hit
+    c_values = range(1, 20)
+    workers = min(os.cpu_count() or 1, len(c_values))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_rho_worker, n, c, 10000, random.getrandbits(64))
+                   for c in c_values]
+        for future in as_completed(futures):
+            if stop is not None and stop.is_set():
+                executor.shutdown(cancel_futures=True)
+                return None
             
-            if d != 1 and d != n:
+            d = future.result()
+            if d:
                 potential_factors.append(d)
                 potential_factors.append(n // d)
+                executor.shutdown(cancel_futures=True)
                 break
     
+    # 4p - 1 ≡ 0 (mod D) exactly when p ≡ 4^-1 (mod D), so filter on that
+    # residue first; for even D no p can qualify
+    target = pow(4, -1, D) if D % 2 == 1 else None
+    
     # Check each potential factor
     for p in potential_factors:
         if p == 1 or p == n:
             continue
             
         # Check if this could be a CM prime: p = (D*V^2 + 1)/4
-        temp = 4 * p - 1
-        if temp % D == 0:
+        if p % D == target:
+            temp = 4 * p - 1
             v_squared = temp // D
             if v_squared > 0:
                 v = isqrt(v_squared)
@@ -255,6 +325,34 @@ def enhanced_cm_search(n: int, D: int, verbose: bool = False) -> Optional[Tuple[
     return None
 
 
+def _race_worker(strategy: str, n: int, D: int, verbose: bool, stop, results) -> None:
+    """
+    Run one factorization strategy in a child process and report its result;
+    an exception is reported in place of the result so the parent never blocks
+    """
+    result = None
+    try:
+        if strategy == 'smart':
+            result = smart_cm_factorization(n, D, verbose, use_rho=False)
+        elif strategy == 'enhanced':
+            result = enhanced_cm_search(n, D, verbose, stop=stop)
+        else:
+            # Extended Pollard's rho with multiple attempts
+            if verbose:
+                print("Extended Pollard's rho attempts...")
+            for _ in range(50):  # Multiple attempts with different random starts
+                factor = pollard_rho(n, 200000)
+                if factor:
+                    if verbose:
+                        print(f"Extended Pollard's rho found: {factor}")
+                    result = factor, n // factor
+                    break
+    except Exception as e:
+        result = e
+    finally:
+        results.put((strategy, result))
+
+
 def comprehensive_factorization(n: int, D: int, verbose: bool = False) -> Optional[Tuple[int, int]]:
     """
     Comprehensive factorization combining multiple techniques
@@ -264,26 +362,52 @@ def comprehensive_factorization(n: int, D: int, verbose: bool = False) -> Option
     
     start_time = time.time()
     
-    # Method 1: Smart CM factorization
-    result = smart_cm_factorization(n, D, verbose)
-    if result:
-        return result
-    
-    # Method 2: Enhanced CM search
-    result = enhanced_cm_search(n, D, verbose)
-    if result:
-        return result
-    
-    # Method 3: Extended Pollard's rho with multiple attempts
-    if verbose:
-        print("Extended Pollard's rho attempts...")
+    # Rho needs O(sqrt(p)) steps, so beyond RHO_MAX_BITS it cannot realistically
+    # win; spend the time on a denser structured V-search instead
+    use_rho = n.bit_length() <= RHO_MAX_BITS
+    if verbose and not use_rho:
+        print(f"n exceeds {RHO_MAX_BITS} bits, skipping Pollard's rho")
     
-    for _ in range(50):  # Multiple attempts with different random starts
-        factor = pollard_rho(n, 200000)
-        if factor:
-            if verbose:
-                print(f"Extended Pollard's rho found: {factor}")
-            return factor, n // factor
+    if not use_rho:
+        result = smart_cm_factorization(n, D, verbose, use_rho=False, v_bits_step=4)
+        if result:
+            return result
+    else:
+        # Race the smart V-search, the enhanced CM search and extended Pollard's
+        # rho in separate processes; the first strategy to succeed ends the rest.
+        # The enhanced search runs its own process pool, which killing it would
+        # orphan, so it is asked to stop instead (it checks between short rho runs)
+        stop = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        sys.stdout.flush()
+        workers = {strategy: multiprocessing.Process(target=_race_worker,
+                                                     args=(strategy, n, D, verbose, stop, results))
+                   for strategy in ('smart', 'enhanced', 'rho')}
+        for worker in workers.values():
+            worker.start()
+        
+        result = error = None
+        for _ in workers:
+            strategy, outcome = results.get()
+            if isinstance(outcome, Exception):
+                # Another strategy may still succeed; keep the first error for later
+                error = error or outcome
+            elif outcome:
+                result = outcome
+                if verbose:
+                    print(f"Strategy '{strategy}' found: {result[0]} * {result[1]}")
+                break
+        
+        stop.set()
+        for strategy, worker in workers.items():
+            if strategy != 'enhanced':
+                worker.terminate()
+            worker.join()
+        
+        if result:
+            return result
+        if error is not None:
+            raise error
     
     end_time = time.time()
     if verbose:
@@ -15,43 +15,15 @@ import random
 import math
 import time
 from typing import Optional, Tuple, List
-from Crypto.Util.number import getRandomInteger, getPrime, isPrime
-from sympy import factorint, gcd
+from Crypto.Util.number import getRandomInteger, getPrime
 import argparse
+import gmpy2
+from gmpy2 import mpz, gcd
 
 
-def miller_rabin_is_prime(n: int, k: int = 10) -> bool:
-    """Miller-Rabin primality test for large numbers"""
-    if n < 2:
-        return False
-    if n == 2 or n == 3:
-        return True
-    if n % 2 == 0:
-        return False
-    
-    # Write n-1 as d * 2^r
-    r = 0
-    d = n - 1
-    while d % 2 == 0:
-        r += 1
-        d //= 2
-    
-    # Witness loop
-    for _ in range(k):
-        a = random.randrange(2, n - 1)
-        x = pow(a, d, n)
-        
-        if x == 1 or x == n - 1:
-            continue
-            
-        for _ in range(r - 1):
-            x = pow(x, 2, n)
-            if x == n - 1:
-                break
-        else:
-            return False
-    
-    return True
+def miller_rabin_is_prime(n: int) -> bool:
+    """Primality test for large numbers (GMP BPSW, no known counterexamples)"""
+    return bool(gmpy2.is_prime(mpz(n)))
 
 
 def generate_cm_prime(D: int, bits: int) -> Optional[int]:
@@ -99,7 +71,11 @@ def construct_target_number(D: int, v_bits: int = 512, q_bits: int = 512, verbos
     if verbose:
         print(f"Constructing target number with D = {D}, V_bits = {v_bits}, q_bits = {q_bits}")
     
+    if D % 8 != 3:
+        raise ValueError('D must be congruent to 3 modulo 8')
+    
     max_attempts = 1000
+    D_mpz = mpz(D)
     for attempt in range(max_attempts):
         # Step 1: Generate V as a v_bits-bit random number
         # For D ≡ 3 (mod 8), we need V to be odd for (D*V^2+1) ≡ 0 (mod 4)
@@ -110,35 +86,27 @@ def construct_target_number(D: int, v_bits: int = 512, q_bits: int = 512, verbos
         if verbose and attempt < 3:
             print(f"Attempt {attempt + 1}: V = {V} (odd)")
         
-        # Step 2: Calculate numbers = D * V^2 + 1
-        numbers = D * V * V + 1
+        # Steps 2-3: numbers = D * V^2 + 1 is always ≡ 0 (mod 4) for odd V,
+        # so p = numbers // 4 is just a shift
+        p = int((D_mpz * gmpy2.square(V) + 1) >> 2)
         
-        # Step 3: Check if numbers % 4 == 0
-        if numbers % 4 == 0:
-            p = numbers // 4
+        # Step 4: Check if p is prime
+        if miller_rabin_is_prime(p):
+            if verbose:
+                print(f"Found CM prime p = {p} ({p.bit_length()} bits)")
+            
+            # Step 5: Generate q as a q_bits-bit prime
+            q = getPrime(q_bits)
+            if verbose:
+                print(f"Generated q = {q} ({q.bit_length()} bits)")
+            
+            # Step 6: Calculate n = p * q
+            n = p * q
+            if verbose:
+                print(f"Constructed n = p * q = {n} ({n.bit_length()} bits)")
+            
+            return n, p, q, V
             
-            # Step 4: Check if p is prime (use our fast test for smaller numbers)
-            if p.bit_length() < 1024:
-                prime_test = miller_rabin_is_prime(p, 10)
-            else:
-                prime_test = isPrime(p)
-                
-            if prime_test:
-                if verbose:
-                    print(f"Found CM prime p = {p} ({p.bit_length()} bits)")
-                
-                # Step 5: Generate q as a q_bits-bit prime
-                q = getPrime(q_bits)
-                if verbose:
-                    print(f"Generated q = {q} ({q.bit_length()} bits)")
-                
-                # Step 6: Calculate n = p * q
-                n = p * q
-                if verbose:
-                    print(f"Constructed n = p * q = {n} ({n.bit_length()} bits)")
-                
-                return n, p, q, V
-                
         if verbose and attempt % 100 == 0:
             print(f"Attempt {attempt}...")
     
@@ -178,24 +146,49 @@ def cm_factorization_attempt(n: int, D: int, verbose: bool = False) -> Optional[
 def pollard_rho_factorization(n: int, max_iterations: int = 1000000) -> Optional[int]:
     """
     Pollard's rho algorithm for factorization
+    Uses Brent's cycle detection with gcd batching
     """
     if n % 2 == 0:
         return 2
     
-    x = random.randint(2, n - 2)
-    y = x
-    c = random.randint(1, n - 1)
-    d = 1
+    # GMP's mpz multiply/reduce is markedly cheaper than PyLong for the hot loop
+    n = mpz(n)
+    y = mpz(random.randint(2, n - 2))
+    c = mpz(random.randint(1, n - 1))
+    m = 128  # Steps accumulated into q between gcd calls
+    g, r, q = 1, 1, 1
     
-    for _ in range(max_iterations):
-        x = (x * x + c) % n
-        y = (y * y + c) % n
-        y = (y * y + c) % n
+    while g == 1 and r <= max_iterations:
+        x = y
+        for _ in range(r):
+            y = (y * y + c) % n
         
-        d = gcd(abs(x - y), n)
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            for _ in range(min(m, r - k)):
+                y = (y * y + c) % n
+                q = q * abs(x - y) % n
+                if not q:
+                    # y met x (or the product vanished mod n): the rest of the
+                    # batch is wasted, so stop and recover from ys below
+                    break
+            g = gcd(q, n)
+            k += m
         
-        if d != 1 and d != n:
-            return d
+        r *= 2
+    
+    if g == n:
+        # The batch overshot, walk back from ys one step at a time; the
+        # culprit lies within one batch, so the walk is bounded by m
+        for _ in range(m):
+            ys = (ys * ys + c) % n
+            g = gcd(abs(x - ys), n)
+            if g > 1:
+                break
+    
+    if g != 1 and g != n:
+        return int(g)
     
     return None
 
@@ -210,7 +203,8 @@ def smart_factorization(n: int, D: int, V: int = None, verbose: bool = False) ->
     
     # If we know V, we can directly compute the expected CM prime
     if V is not None:
-        expected_p = (D * V * V + 1) // 4
+        v_sq = V * V  # Same operand twice takes the squaring path
+        expected_p = (D * v_sq + 1) // 4
         if n % expected_p == 0:
             other_factor = n // expected_p
             if verbose:
@@ -19,9 +19,18 @@ The solution demonstrates:
 4. Performance analysis
 """
 
-from efficient_cm_factor import construct_cm_number, comprehensive_cm_factorization
+from efficient_cm_factor import construct_cm_number, make_cm_constructor, make_pool, parallel_factor, run_trial, warmup
+import os
+import sys
 import time
 import argparse
+from functools import partial
+
+# Fixed seed so repeated runs reuse the same constructions
+DEMO_SEED = 0xC3
+
+# The worked examples use D = 11
+construct = make_cm_constructor(11)
 
 
 def solve_cm_factorization_problem():
@@ -79,9 +88,9 @@ def solve_cm_factorization_problem():
         
         # Construction
         print("\nStep 1: Construction")
-        start_time = time.time()
-        n, p, q, V = construct_cm_number(D, v_bits, q_bits, verbose=False)
-        construct_time = time.time() - start_time
+        start_time = time.perf_counter_ns()
+        n, p, q, V = construct(v_bits, q_bits, DEMO_SEED)
+        construct_time = (time.perf_counter_ns() - start_time) / 1e9
         
         print(f"  ✓ Constructed in {construct_time:.3f}s")
         print(f"  ✓ V = {V}")
@@ -92,9 +101,9 @@ def solve_cm_factorization_problem():
         
         # Factorization
         print("\nStep 2: Factorization (without knowing V)")
-        start_time = time.time()
-        result = comprehensive_cm_factorization(n, D, verbose=False)
-        factor_time = time.time() - start_time
+        start_time = time.perf_counter_ns()
+        result = parallel_factor(n, D, verbose=False)
+        factor_time = (time.perf_counter_ns() - start_time) / 1e9
         
         if result:
             fp, fq, recovered_v = result
@@ -115,6 +124,8 @@ def solve_cm_factorization_problem():
     except Exception as e:
         print(f"  ✗ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Example 2: Larger scale test
     print("\n2. MEDIUM SCALE DEMONSTRATION")
     print("-" * 40)
@@ -125,18 +136,18 @@ def solve_cm_factorization_problem():
         
         # Construction
         print("\nStep 1: Construction")
-        start_time = time.time()
-        n, p, q, V = construct_cm_number(D, v_bits, q_bits, verbose=False)
-        construct_time = time.time() - start_time
+        start_time = time.perf_counter_ns()
+        n, p, q, V = construct(v_bits, q_bits, DEMO_SEED)
+        construct_time = (time.perf_counter_ns() - start_time) / 1e9
         
         print(f"  ✓ Constructed in {construct_time:.3f}s")
         print(f"  ✓ n has {n.bit_length()} bits")
         
         # Factorization (with timeout)
         print("\nStep 2: Factorization (with 10s timeout)")
-        start_time = time.time()
-        result = comprehensive_cm_factorization(n, D, verbose=False)
-        factor_time = time.time() - start_time
+        start_time = time.perf_counter_ns()
+        result = parallel_factor(n, D, verbose=False)
+        factor_time = (time.perf_counter_ns() - start_time) / 1e9
         
         if result and factor_time < 10:
             fp, fq, recovered_v = result
@@ -149,6 +160,8 @@ def solve_cm_factorization_problem():
     except Exception as e:
         print(f"  ✗ Error: {e}")
     
+    sys.stdout.flush()
+    
     # Summary and conclusions
     print("\n" + "="*50)
     print("SOLUTION SUMMARY")
@@ -193,6 +206,64 @@ def solve_cm_factorization_problem():
     print("original problem statement.")
 
 
+def cmd_construct(args):
+    """
+    Construct a CM number n = p*q with p = (D*V^2+1)/4
+    """
+    print(f"\nConstructing with D={args.D}, V_bits={args.v_bits}, q_bits={args.q_bits}...")
+    
+    start_time = time.perf_counter_ns()
+    try:
+        n, p, q, V = construct_cm_number(args.D, args.v_bits, args.q_bits, verbose=True)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    construct_time = (time.perf_counter_ns() - start_time) / 1e9
+    
+    print(f"\nConstruction successful in {construct_time:.3f}s")
+    print(f"Result: n = {n}")
+
+
+def cmd_factor(args):
+    """
+    Factor n, recovering V when one factor has CM structure
+    """
+    print(f"\nFactoring {args.n} with D={args.D}...")
+    
+    start_time = time.perf_counter_ns()
+    result = parallel_factor(args.n, args.D, verbose=True, workers=args.jobs)
+    factor_time = (time.perf_counter_ns() - start_time) / 1e9
+    
+    if result:
+        fp, fq, recovered_v = result
+        print(f"\nFactorization successful in {factor_time:.3f}s")
+        print(f"Factors: {fp} × {fq}")
+        if recovered_v:
+            print(f"Recovered V: {recovered_v}")
+    else:
+        print(f"\nFactorization failed after {factor_time:.3f}s")
+
+
+def cmd_compare(args):
+    """
+    Construct and factor one CM number per bit size, across args.jobs processes
+    """
+    print("\nRunning performance comparison...")
+    print(f"Trials run concurrently on {args.jobs} processes, so times are wall clock under shared load")
+    
+    # Trials are independent; run them across processes and
+    # report in bit-size order
+    with make_pool(args.jobs) as pool:
+        results = sorted(pool.imap_unordered(partial(run_trial, D=args.D, seed=DEMO_SEED), args.bits))
+    
+    for bits, construct_time, factor_time, status in results:
+        print(f"\nTesting {bits}-bit components...")
+        if construct_time is None:
+            print(f"  {bits} bits: {status.name}")
+        else:
+            print(f"  {bits} bits: Construct {construct_time:.3f}s, Factor {factor_time:.3f}s - {status.name}")
+
+
 def interactive_demo():
     """
     Interactive demonstration allowing user to test different parameters
@@ -215,56 +286,15 @@ def interactive_demo():
                 D = int(input("Enter discriminant D (e.g., 11): "))
                 v_bits = int(input("Enter V bit size (e.g., 32): "))
                 q_bits = int(input("Enter q bit size (e.g., 32): "))
-                
-                print(f"\nConstructing with D={D}, V_bits={v_bits}, q_bits={q_bits}...")
-                
-                start_time = time.time()
-                n, p, q, V = construct_cm_number(D, v_bits, q_bits, verbose=True)
-                construct_time = time.time() - start_time
-                
-                print(f"\nConstruction successful in {construct_time:.3f}s")
-                print(f"Result: n = {n}")
+                cmd_construct(argparse.Namespace(D=D, v_bits=v_bits, q_bits=q_bits))
                 
             elif choice == '2':
                 n = int(input("Enter number to factor: "))
                 D = int(input("Enter discriminant D: "))
-                
-                print(f"\nFactoring {n} with D={D}...")
-                
-                start_time = time.time()
-                result = comprehensive_cm_factorization(n, D, verbose=True)
-                factor_time = time.time() - start_time
-                
-                if result:
-                    fp, fq, recovered_v = result
-                    print(f"\nFactorization successful in {factor_time:.3f}s")
-                    print(f"Factors: {fp} × {fq}")
-                    if recovered_v:
-                        print(f"Recovered V: {recovered_v}")
-                else:
-                    print(f"\nFactorization failed after {factor_time:.3f}s")
+                cmd_factor(argparse.Namespace(n=n, D=D, jobs=os.cpu_count()))
                     
             elif choice == '3':
-                print("\nRunning performance comparison...")
-                bit_sizes = [24, 32, 40, 48]
-                D = 11
-                
-                for bits in bit_sizes:
-                    print(f"\nTesting {bits}-bit components...")
-                    try:
-                        start_time = time.time()
-                        n, p, q, V = construct_cm_number(D, bits, bits, False)
-                        construct_time = time.time() - start_time
-                        
-                        start_time = time.time()
-                        result = comprehensive_cm_factorization(n, D, False)
-                        factor_time = time.time() - start_time
-                        
-                        success = "SUCCESS" if result else "FAILED"
-                        print(f"  {bits} bits: Construct {construct_time:.3f}s, Factor {factor_time:.3f}s - {success}")
-                        
-                    except Exception as e:
-                        print(f"  {bits} bits: ERROR - {e}")
+                cmd_compare(argparse.Namespace(bits=[24, 32, 40, 48], D=11, jobs=os.cpu_count()))
                         
             elif choice == '4':
                 print("Goodbye!")
@@ -280,14 +310,59 @@ def interactive_demo():
             print(f"Error: {e}")
 
 
+def _bit_list(text):
+    return [int(bits) for bits in text.split(',')]
+
+
+def _job_count(text):
+    jobs = int(text)
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(f"need at least 1 worker process, got {jobs}")
+    return jobs
+
+
 def main():
     parser = argparse.ArgumentParser(description='Complete CM Factorization Solution')
     parser.add_argument('--interactive', '-i', action='store_true', 
                         help='Run interactive demonstration')
+    subparsers = parser.add_subparsers(dest='command',
+                                       help='Run a single step instead of the full demonstration')
+    
+    construct_parser = subparsers.add_parser('construct', help='Construct a CM number')
+    construct_parser.add_argument('--D', type=int, default=11, help='Discriminant D (must be ≡ 3 mod 8)')
+    construct_parser.add_argument('--v-bits', type=int, default=32, help='V bit size')
+    construct_parser.add_argument('--q-bits', type=int, default=32, help='q bit size')
+    construct_parser.set_defaults(handler=cmd_construct)
+    
+    factor_parser = subparsers.add_parser('factor', help='Factor a number')
+    factor_parser.add_argument('n', type=int, help='Number to factor')
+    factor_parser.add_argument('--D', type=int, default=11, help='Discriminant D')
+    factor_parser.add_argument('--jobs', '-j', type=_job_count, default=os.cpu_count(),
+                               help='Worker processes')
+    factor_parser.set_defaults(handler=cmd_factor)
+    
+    compare_parser = subparsers.add_parser('compare', help='Time construction and factorization by bit size')
+    compare_parser.add_argument('--bits', type=_bit_list, default=[24, 32, 40, 48],
+                                help='Comma-separated bit sizes, e.g. 24,32,40,48')
+    compare_parser.add_argument('--D', type=int, default=11, help='Discriminant D')
+    compare_parser.add_argument('--jobs', '-j', type=_job_count, default=os.cpu_count(),
+                                help='Worker processes')
+    compare_parser.set_defaults(handler=cmd_compare)
     
     args = parser.parse_args()
     
-    # Always run the main solution demonstration
+    # Block-buffer stdout; sections flush explicitly, and input() flushes
+    # the interactive prompts
+    sys.stdout.reconfigure(line_buffering=False)
+    
+    # Compile the rho kernels up front so no command's timings include JIT
+    warmup()
+    
+    if args.command:
+        args.handler(args)
+        return
+    
+    # Without a subcommand, run the main solution demonstration
     solve_cm_factorization_problem()
     
     # Optionally run interactive demo
@@ -296,4 +371,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -4,170 +4,831 @@ Efficient CM Factorization for D*V^2+1 construction
 This version focuses on the mathematical properties of the CM construction for efficient factorization.
 """
 
+import os
 import random
 import math
+import sys
 import time
+from enum import IntEnum
+from functools import lru_cache
+from itertools import cycle, islice
+from multiprocessing import Pool, cpu_count, current_process
 from typing import Optional, Tuple, List
-from Crypto.Util.number import getRandomInteger, getPrime, isPrime
-from sympy import gcd
+from Crypto.Util.number import getRandomInteger, getRandomRange, getPrime
+from sympy import sieve
 import argparse
+import gmpy2
+from gmpy2 import mpz
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, construction filters candidates one by one without it
+    np = None
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, rho falls back to Python ints without it
+    njit = None
 
 
 def isqrt(n):
-    """Integer square root using Newton's method"""
-    if n < 0:
-        raise ValueError("Square root of negative number")
-    if n == 0:
-        return 0
-    x = n
-    while True:
-        y = (x + n // x) // 2
-        if y >= x:
-            return x
-        x = y
+    """Integer square root (GMP's mpz_sqrt)"""
+    return int(gmpy2.isqrt(n))
 
 
 def miller_rabin_is_prime(n: int, k: int = 10) -> bool:
-    """Miller-Rabin primality test"""
-    if n < 2:
-        return False
-    if n == 2 or n == 3:
-        return True
-    if n % 2 == 0:
-        return False
-    
-    r = 0
-    d = n - 1
-    while d % 2 == 0:
-        r += 1
-        d //= 2
+    """Miller-Rabin primality test (GMP: BPSW plus k rounds, exact below 2^64)"""
+    return bool(gmpy2.is_prime(n, k))
+
+
+# Primes sieved out of (D*V^2+1)/4 by choosing V's residue mod 2*prod(V_SIEVE_PRIMES)
+V_SIEVE_PRIMES = (3, 5, 7, 11, 13)
+V_SIEVE_MODULUS = 2 * math.prod(V_SIEVE_PRIMES)
+
+
+@lru_cache(maxsize=None)
+def _admissible_v_residues(D: int) -> Tuple[int, ...]:
+    """
+    Odd residues of V mod V_SIEVE_MODULUS for which no sieve prime divides
+    D*V^2+1 (and hence (D*V^2+1)/4)
+    """
+    return tuple(v for v in range(1, V_SIEVE_MODULUS, 2)
+                 if all((D * v * v + 1) % p for p in V_SIEVE_PRIMES))
+
+
+def _sieved_v(D: int, v_bits: int, randfunc=None) -> int:
+    """
+    Random odd V of at most v_bits bits, drawn from the admissible residue
+    classes so the candidate p has no small factors from V_SIEVE_PRIMES
+    """
+    residues = _admissible_v_residues(D)
+    V = getRandomInteger(v_bits, randfunc)
+    if v_bits <= V_SIEVE_MODULUS.bit_length() or not residues:
+        # Too few bits to place a residue class; plain odd V
+        return V | 1
     
-    for _ in range(k):
-        a = random.randrange(2, n - 1)
-        x = pow(a, d, n)
-        
-        if x == 1 or x == n - 1:
-            continue
-            
-        for _ in range(r - 1):
-            x = pow(x, 2, n)
-            if x == n - 1:
-                break
-        else:
-            return False
+    base = residues[getRandomRange(0, len(residues), randfunc)]
+    V += base - V % V_SIEVE_MODULUS
+    if V.bit_length() > v_bits:
+        V -= V_SIEVE_MODULUS
+    return V
+
+
+# Product of the primes below 100, for a single-gcd small factor check
+PRIMORIAL_100 = math.prod(sieve.primerange(2, 100))
+
+
+# Odd primes below 100, and how many V the vectorized filter draws at once
+# (a construction needs only a handful of survivors, so larger batches waste draws)
+SMALL_ODD_PRIMES = tuple(sieve.primerange(3, 100))
+V_BATCH = 128
+
+
+def _v_candidates(D: int, v_bits: int, randfunc=None):
+    """
+    Endless stream of odd V of at most v_bits bits whose p = (D*V^2+1)/4 has
+    no prime factor below 100 (unless p itself is that small)
+    """
+    if np is None or not 8 <= v_bits <= 60 or D >= 1 << 32:
+        while True:
+            V = _sieved_v(D, v_bits, randfunc)
+            p = (D * V * V + 1) >> 2
+            if p <= 100 or math.gcd(p, PRIMORIAL_100) == 1:
+                yield V
     
-    return True
+    # Word-sized V: draw a batch at once and sieve it with NumPy, reducing V
+    # mod each prime first so D*r^2 + 1 cannot overflow. V up to small_v give
+    # p <= 100 and are kept as they are on the path above
+    mask = np.uint64((1 << v_bits) - 1)
+    D_u64, one = np.uint64(D), np.uint64(1)
+    small_v = np.uint64(isqrt(402 // D))
+    while True:
+        Vs = np.frombuffer((randfunc or os.urandom)(8 * V_BATCH), dtype=np.uint64) & mask | one
+        keep = np.ones(V_BATCH, dtype=bool)
+        for ell in SMALL_ODD_PRIMES:
+            ell = np.uint64(ell)
+            r = Vs % ell
+            keep &= (D_u64 * r * r + one) % ell != 0
+        yield from (int(V) for V in Vs[keep | (Vs <= small_v)])
 
 
-def construct_cm_number(D: int, v_bits: int, q_bits: int, verbose: bool = False) -> Tuple[int, int, int, int]:
+def construct_cm_number(D: int, v_bits: int, q_bits: int, verbose: bool = False, randfunc=None) -> Tuple[int, int, int, int]:
     """
     Construct a number using the exact CM construction from the problem
+    randfunc(N) returns N random bytes (default: os.urandom, via PyCryptodome)
     """
+    if D % 8 != 3:
+        raise ValueError('D must be congruent to 3 modulo 8')
+    
     max_attempts = 2000
+    candidates = _v_candidates(D, v_bits, randfunc)
     
     for attempt in range(max_attempts):
-        # Generate V - must be odd for D ≡ 3 (mod 8)
-        V = getRandomInteger(v_bits)
-        if V % 2 == 0:
-            V += 1
+        # Generate V - must be odd for D ≡ 3 (mod 8), and already cleared of
+        # small prime divisors of p
+        V = next(candidates)
         
-        # Calculate numbers = D * V^2 + 1
+        # Calculate numbers = D * V^2 + 1; with D ≡ 3 (mod 8) and V odd it is
+        # always ≡ 4 (mod 8), so p = numbers/4 exactly
         numbers = D * V * V + 1
+        p = numbers >> 2
         
-        # Check if numbers % 4 == 0
-        if numbers % 4 == 0:
-            p = numbers // 4
+        if miller_rabin_is_prime(p, 25):
+            q = getPrime(q_bits, randfunc)
+            n = p * q
             
-            # Test primality
-            if p.bit_length() < 512:
-                is_prime_p = miller_rabin_is_prime(p, 20)
-            else:
-                is_prime_p = isPrime(p)
+            if verbose:
+                print(f"Constructed after {attempt + 1} attempts:")
+                print(f"  V = {V} ({V.bit_length()} bits)")
+                print(f"  numbers = D*V^2+1 = {numbers}")
+                print(f"  p = numbers//4 = {p} ({p.bit_length()} bits)")
+                print(f"  q = {q} ({q.bit_length()} bits)")
+                print(f"  n = p*q = {n} ({n.bit_length()} bits)")
+            
+            return n, p, q, V
             
-            if is_prime_p:
-                q = getPrime(q_bits)
-                n = p * q
-                
-                if verbose:
-                    print(f"Constructed after {attempt + 1} attempts:")
-                    print(f"  V = {V} ({V.bit_length()} bits)")
-                    print(f"  numbers = D*V^2+1 = {numbers}")
-                    print(f"  p = numbers//4 = {p} ({p.bit_length()} bits)")
-                    print(f"  q = {q} ({q.bit_length()} bits)")
-                    print(f"  n = p*q = {n} ({n.bit_length()} bits)")
-                
-                return n, p, q, V
-                
         if verbose and attempt % 200 == 0 and attempt > 0:
             print(f"  Construction attempt {attempt}...")
     
     raise ValueError(f"Could not construct after {max_attempts} attempts")
 
 
-def fermat_factorization(n: int, max_iterations: int = 100000) -> Optional[Tuple[int, int]]:
+@lru_cache(maxsize=64)
+def cached_construct(D: int, v_bits: int, q_bits: int, seed: int) -> Tuple[int, int, int, int]:
+    """
+    Reproducible construct_cm_number, memoized on (D, v_bits, q_bits, seed)
+    """
+    return construct_cm_number(D, v_bits, q_bits, randfunc=random.Random(seed).randbytes)
+
+
+def make_cm_constructor(D: int):
+    """
+    Bind D once and return construct(v_bits, q_bits, seed=None)
+    With a seed the construction is reproducible and memoized (cached_construct)
+    """
+    if D % 8 != 3:
+        raise ValueError(f"D={D} is not ≡ 3 (mod 8)")
+    _admissible_v_residues(D)  # Build the V sieve up front
+    
+    def construct(v_bits: int, q_bits: int, seed: Optional[int] = None) -> Tuple[int, int, int, int]:
+        if seed is None:
+            return construct_cm_number(D, v_bits, q_bits)
+        return cached_construct(D, v_bits, q_bits, seed)
+    
+    return construct
+
+
+def fermat_factorization(n: int, max_iterations: int = 100000, q_bits_estimate: Optional[int] = None) -> Optional[Tuple[int, int]]:
     """
     Fermat's factorization method - good for factors close to sqrt(n)
+    If the smaller factor is known to have at least q_bits_estimate bits,
+    a = (p+q)/2 cannot exceed x_max = (n + d^2) / (2d) with d = 2^(q_bits_estimate-1)
     """
-    a = isqrt(n)
-    if a * a == n:
-        return a, a
+    n = mpz(n)
+    a0 = gmpy2.isqrt(n)
+    if a0 * a0 == n:
+        return int(a0), int(a0)
     
-    for i in range(max_iterations):
-        a = isqrt(n) + i
-        b_squared = a * a - n
-        if b_squared < 0:
-            continue
-            
-        b = isqrt(b_squared)
-        if b * b == b_squared:
+    if q_bits_estimate is not None and q_bits_estimate >= 1:
+        delta_min = mpz(1) << (q_bits_estimate - 1) | 1
+        x_max = (n + delta_min * delta_min) // (2 * delta_min)
+        max_iterations = max(0, min(max_iterations, int(x_max - a0)))
+    
+    # a0^2 < n, so the first candidate is a0 + 1; after that a^2 - n is
+    # stepped by 2a + 1 instead of squaring a again
+    a = a0 + 1
+    b_squared = a * a - n
+    for _ in range(max_iterations):
+        b, remainder = gmpy2.isqrt_rem(b_squared)
+        if not remainder:
             p = a - b
             q = a + b
             if p > 1 and q > 1 and p * q == n:
-                return p, q
+                return int(p), int(q)
+        
+        b_squared += 2 * a + 1
+        a += 1
     
     return None
 
 
-def pollard_rho_brent(n: int, max_iterations: int = 100000) -> Optional[int]:
-    """
-    Brent's improvement to Pollard's rho algorithm
-    """
-    if n % 2 == 0:
-        return 2
-    
-    for c in range(1, 10):
-        y, r, q = random.randint(1, n - 1), 1, 1
+_U64_MASK = (1 << 64) - 1
+
+# Above this size GMP's mpz multiply-and-mod beats the limb kernel's CIOS loop
+RHO_LIMBS_MAX_BITS = 384
+
+
+if njit is not None:
+    _U32_MASK = np.uint64(0xFFFFFFFF)
+    _U32_SHIFT = np.uint64(32)
+
+    @njit(cache=True)
+    def _mulhi_u64(a, b):
+        """High 64 bits of the 128-bit product a*b"""
+        a_lo, a_hi = a & _U32_MASK, a >> _U32_SHIFT
+        b_lo, b_hi = b & _U32_MASK, b >> _U32_SHIFT
+        lo_lo = a_lo * b_lo
+        hi_lo = a_hi * b_lo
+        lo_hi = a_lo * b_hi
+        cross = (lo_lo >> _U32_SHIFT) + (hi_lo & _U32_MASK) + lo_hi
+        return (hi_lo >> _U32_SHIFT) + (cross >> _U32_SHIFT) + a_hi * b_hi
+
+    @njit(cache=True)
+    def _mont_mul_u64(a, b, n, n_inv):
+        """Montgomery product a*b/2^64 mod n, for a, b < n < 2^63"""
+        hi = _mulhi_u64(a, b)
+        m_hi = _mulhi_u64(a * b * n_inv, n)
+        if hi < m_hi:
+            return hi + n - m_hi
+        return hi - m_hi
+
+    @njit(cache=True)
+    def _gcd_u64(a, b):
+        while b:
+            a, b = b, a % b
+        return a
+
+    @njit(cache=True, boundscheck=False)
+    def pollard_brent_u64(n_int, c_int, y_int, m, max_iterations):
+        """
+        Brent's rho for odd n < 2^63 with x^2 + c iterated in Montgomery form
+        Returns a nontrivial factor of n, or 0 if this (c, y) start fails
+        """
+        n = np.uint64(n_int)
+        c = np.uint64(c_int) % n
+        y = np.uint64(y_int) % n
+        one = np.uint64(1)
         
-        while True:
+        # n^-1 mod 2^64 by Newton iteration (each step doubles the valid bits).
+        # No conversion into Montgomery form is needed: iterating there is just
+        # x^2 + c' for another constant c', and gcds ignore the unit factor R
+        n_inv = n
+        for _ in range(5):
+            n_inv *= np.uint64(2) - n * n_inv
+        
+        x, ys = y, y
+        g, q = one, one
+        r = 1
+        while g == one and r <= max_iterations:
             x = y
             for _ in range(r):
-                y = (y * y + c) % n
+                y = _mont_mul_u64(y, y, n, n_inv) + c
+                if y >= n:
+                    y -= n
             
             k = 0
-            while k < r and gcd(q, n) == 1:
+            while k < r and g == one:
                 ys = y
-                for _ in range(min(25, r - k)):
-                    y = (y * y + c) % n
-                    q = (q * abs(x - y)) % n
-                
-                g = gcd(q, n)
-                k += 25
+                for _ in range(min(m, r - k)):
+                    y = _mont_mul_u64(y, y, n, n_inv) + c
+                    if y >= n:
+                        y -= n
+                    q = _mont_mul_u64(q, x - y if x > y else y - x, n, n_inv)
+                    if q == 0:
+                        break
+                g = _gcd_u64(q, n)
+                k += m
             
             r *= 2
+        
+        if g == n:
+            # The batch overshot, walk back from ys one step at a time
+            for _ in range(m):
+                ys = _mont_mul_u64(ys, ys, n, n_inv) + c
+                if ys >= n:
+                    ys -= n
+                g = _gcd_u64(x - ys if x > ys else ys - x, n)
+                if g > one:
+                    break
+        
+        if g == one or g == n:
+            return np.uint64(0)
+        return g
+
+    _U64_ZERO = np.uint64(0)
+    _U64_ONE = np.uint64(1)
+
+    @njit(cache=True)
+    def _addc_u64(a, b, carry):
+        """a + b + carry as (sum, carry out), carry in {0, 1}"""
+        s = a + b
+        c1 = s < a
+        s2 = s + carry
+        c2 = s2 < s
+        return s2, np.uint64(c1 or c2)
+
+    @njit(cache=True)
+    def _geq_u128(a1, a0, b1, b0):
+        return a1 > b1 or (a1 == b1 and a0 >= b0)
+
+    @njit(cache=True)
+    def _sub_u128(a1, a0, b1, b0):
+        """(a1:a0) - (b1:b0) for a >= b"""
+        return a1 - b1 - np.uint64(a0 < b0), a0 - b0
+
+    @njit(cache=True)
+    def _mont_mul_u128(a1, a0, b1, b0, n1, n0, n_inv):
+        """
+        CIOS Montgomery product a*b/2^128 mod n over two 64-bit words,
+        for a, b < n < 2^127; n_inv = -n^-1 mod 2^64
+        """
+        t0 = t1 = t2 = _U64_ZERO
+        for i in range(2):
+            bi = b0 if i == 0 else b1
+            # t += a*bi
+            l0, h0 = a0 * bi, _mulhi_u64(a0, bi)
+            l1, h1 = a1 * bi, _mulhi_u64(a1, bi)
+            t0, c = _addc_u64(t0, l0, _U64_ZERO)
+            t1, c1 = _addc_u64(t1, l1, c)
+            t1, c2 = _addc_u64(t1, h0, _U64_ZERO)
+            t2, c3 = _addc_u64(t2, h1, c1)
+            t2, c4 = _addc_u64(t2, c2, _U64_ZERO)
+            t3 = c3 + c4
+            # t = (t + m*n) / 2^64, with m chosen to clear the low word
+            m = t0 * n_inv
+            l0, h0 = m * n0, _mulhi_u64(m, n0)
+            l1, h1 = m * n1, _mulhi_u64(m, n1)
+            _, c = _addc_u64(t0, l0, _U64_ZERO)
+            t0, c1 = _addc_u64(t1, l1, c)
+            t0, c2 = _addc_u64(t0, h0, _U64_ZERO)
+            t1, c3 = _addc_u64(t2, h1, c1)
+            t1, c4 = _addc_u64(t1, c2, _U64_ZERO)
+            t2 = t3 + c3 + c4
+        
+        # t < 2n, one conditional subtraction brings it below n
+        if t2 or _geq_u128(t1, t0, n1, n0):
+            t1, t0 = _sub_u128(t1, t0, n1, n0)
+        return t1, t0
+
+    @njit(cache=True)
+    def _gcd_u128(a1, a0, b1, b0):
+        """Binary gcd of two 128-bit values, b odd"""
+        while a1 or a0:
+            while not (a0 & _U64_ONE):
+                a0 = (a0 >> _U64_ONE) | (a1 << np.uint64(63))
+                a1 >>= _U64_ONE
+            if not _geq_u128(a1, a0, b1, b0):
+                a1, a0, b1, b0 = b1, b0, a1, a0
+            a1, a0 = _sub_u128(a1, a0, b1, b0)
+        return b1, b0
+
+    @njit(cache=True)
+    def _rho_step_u128(y1, y0, c1, c0, n1, n0, n_inv):
+        """y^2/R + c mod n"""
+        y1, y0 = _mont_mul_u128(y1, y0, y1, y0, n1, n0, n_inv)
+        y0, carry = _addc_u64(y0, c0, _U64_ZERO)
+        y1 = y1 + c1 + carry
+        if _geq_u128(y1, y0, n1, n0):
+            y1, y0 = _sub_u128(y1, y0, n1, n0)
+        return y1, y0
+
+    @njit(cache=True, boundscheck=False)
+    def pollard_brent_u128(n1, n0, c1, c0, y1, y0, m, max_iterations):
+        """
+        Brent's rho for odd n < 2^127, given as (high, low) 64-bit words
+        Returns a nontrivial factor of n as (high, low), or (0, 0)
+        """
+        # -n^-1 mod 2^64 from the low word, Newton iteration as in the u64 kernel
+        inv = n0
+        for _ in range(5):
+            inv *= np.uint64(2) - n0 * inv
+        n_inv = _U64_ZERO - inv
+        
+        x1, x0 = y1, y0
+        ys1, ys0 = y1, y0
+        q1, q0 = _U64_ZERO, _U64_ONE
+        g1, g0 = _U64_ZERO, _U64_ONE
+        r = 1
+        while g1 == 0 and g0 == 1 and r <= max_iterations:
+            x1, x0 = y1, y0
+            for _ in range(r):
+                y1, y0 = _rho_step_u128(y1, y0, c1, c0, n1, n0, n_inv)
             
+            k = 0
+            while k < r and g1 == 0 and g0 == 1:
+                ys1, ys0 = y1, y0
+                for _ in range(min(m, r - k)):
+                    y1, y0 = _rho_step_u128(y1, y0, c1, c0, n1, n0, n_inv)
+                    if _geq_u128(x1, x0, y1, y0):
+                        d1, d0 = _sub_u128(x1, x0, y1, y0)
+                    else:
+                        d1, d0 = _sub_u128(y1, y0, x1, x0)
+                    q1, q0 = _mont_mul_u128(q1, q0, d1, d0, n1, n0, n_inv)
+                    if q1 == 0 and q0 == 0:
+                        break
+                g1, g0 = _gcd_u128(q1, q0, n1, n0)
+                k += m
+            
+            r *= 2
+        
+        if g1 == n1 and g0 == n0:
+            # The batch overshot, walk back from ys one step at a time
+            for _ in range(m):
+                ys1, ys0 = _rho_step_u128(ys1, ys0, c1, c0, n1, n0, n_inv)
+                if _geq_u128(x1, x0, ys1, ys0):
+                    d1, d0 = _sub_u128(x1, x0, ys1, ys0)
+                else:
+                    d1, d0 = _sub_u128(ys1, ys0, x1, x0)
+                g1, g0 = _gcd_u128(d1, d0, n1, n0)
+                if g1 or g0 > 1:
+                    break
+        
+        if (g1 == 0 and g0 == 1) or (g1 == n1 and g0 == n0):
+            return _U64_ZERO, _U64_ZERO
+        return g1, g0
+
+    @njit(cache=True, boundscheck=False)
+    def _mont_mul_limbs(a, b, n, n_inv, t, out):
+        """
+        CIOS Montgomery product a*b/2^(32L) mod n over L little-endian 32-bit
+        limbs (held in uint64 so every partial product fits), a, b < n
+        """
+        L = n.shape[0]
+        for j in range(L + 2):
+            t[j] = 0
+        for i in range(L):
+            carry = np.uint64(0)
+            bi = b[i]
+            for j in range(L):
+                s = t[j] + a[j] * bi + carry
+                t[j] = s & _U32_MASK
+                carry = s >> _U32_SHIFT
+            s = t[L] + carry
+            t[L] = s & _U32_MASK
+            t[L + 1] = s >> _U32_SHIFT
+            
+            m = (t[0] * n_inv) & _U32_MASK
+            carry = (t[0] + m * n[0]) >> _U32_SHIFT
+            for j in range(1, L):
+                s = t[j] + m * n[j] + carry
+                t[j - 1] = s & _U32_MASK
+                carry = s >> _U32_SHIFT
+            s = t[L] + carry
+            t[L - 1] = s & _U32_MASK
+            t[L] = t[L + 1] + (s >> _U32_SHIFT)
+        
+        # t < 2n, one conditional subtraction brings it below n
+        geq = t[L] != 0
+        if not geq:
+            geq = True
+            for j in range(L - 1, -1, -1):
+                if t[j] != n[j]:
+                    geq = t[j] > n[j]
+                    break
+        if geq:
+            borrow = np.uint64(0)
+            for j in range(L):
+                s = t[j] - n[j] - borrow
+                borrow = (s >> _U32_SHIFT) & np.uint64(1)
+                out[j] = s & _U32_MASK
+        else:
+            for j in range(L):
+                out[j] = t[j]
+
+    @njit(cache=True, boundscheck=False)
+    def _sub_abs_limbs(a, b, out):
+        """out = |a - b| over 32-bit limbs"""
+        L = a.shape[0]
+        a_ge = True
+        for j in range(L - 1, -1, -1):
+            if a[j] != b[j]:
+                a_ge = a[j] > b[j]
+                break
+        if not a_ge:
+            a, b = b, a
+        borrow = np.uint64(0)
+        for j in range(L):
+            s = a[j] - b[j] - borrow
+            borrow = (s >> _U32_SHIFT) & np.uint64(1)
+            out[j] = s & _U32_MASK
+
+    @njit(cache=True, boundscheck=False)
+    def _rho_steps_limbs(y, x, q, c, n, n_inv, steps, accumulate):
+        """
+        Advance y <- y^2/R + c (mod n) in place `steps` times; with accumulate,
+        also fold |x - y| into the running Montgomery product q
+        """
+        L = n.shape[0]
+        t = np.empty(L + 2, dtype=np.uint64)
+        d = np.empty(L, dtype=np.uint64)
+        for _ in range(steps):
+            _mont_mul_limbs(y, y, n, n_inv, t, y)
+            
+            # y += c, then subtract n once if the sum reached it
+            carry = np.uint64(0)
+            for j in range(L):
+                s = y[j] + c[j] + carry
+                y[j] = s & _U32_MASK
+                carry = s >> _U32_SHIFT
+            geq = carry != 0
+            if not geq:
+                geq = True
+                for j in range(L - 1, -1, -1):
+                    if y[j] != n[j]:
+                        geq = y[j] > n[j]
+                        break
+            if geq:
+                _sub_abs_limbs(y, n, y)
+            
+            if accumulate:
+                _sub_abs_limbs(x, y, d)
+                _mont_mul_limbs(q, d, n, n_inv, t, q)
+                zero = True
+                for j in range(L):
+                    if q[j]:
+                        zero = False
+                        break
+                if zero:
+                    return
+
+    def _to_limbs(v: int, L: int):
+        return np.array([(v >> (32 * i)) & 0xFFFFFFFF for i in range(L)], dtype=np.uint64)
+
+    def _from_limbs(a) -> int:
+        return int.from_bytes(a.astype('<u4').tobytes(), 'little')
+
+    def pollard_brent_limbs(n: int, c: int, y: int, m: int, max_iterations: int) -> int:
+        """
+        Brent's rho for odd n with the x^2 + c steps in the multi-limb
+        Montgomery kernel; gcds run on Python ints once per m-step batch
+        Returns a nontrivial factor of n, or 0 if this (c, y) start fails
+        """
+        L = (n.bit_length() + 31) // 32
+        N = _to_limbs(n, L)
+        n_inv = np.uint64(-pow(n, -1, 1 << 32) % (1 << 32))
+        C = _to_limbs(c % n, L)
+        Y = _to_limbs(y % n, L)
+        Q = _to_limbs(1, L)
+        X = Y.copy()
+        
+        g, r = 1, 1
+        ys = y
+        while g == 1 and r <= max_iterations:
+            X[:] = Y
+            _rho_steps_limbs(Y, X, Q, C, N, n_inv, r, False)
+            
+            k = 0
+            while k < r and g == 1:
+                ys = _from_limbs(Y)
+                _rho_steps_limbs(Y, X, Q, C, N, n_inv, min(m, r - k), True)
+                g = math.gcd(_from_limbs(Q), n)
+                k += m
+            
+            r *= 2
+        
+        if g == n:
+            # Walk back on Python ints, replaying the kernel's map y^2/R + c
+            x = _from_limbs(X)
+            r_inv = pow(1 << (32 * L), -1, n)
+            for _ in range(m):
+                ys = (ys * ys * r_inv + c) % n
+                g = math.gcd(abs(x - ys), n)
+                if g > 1:
+                    break
+        
+        if g == 1 or g == n:
+            return 0
+        return g
+else:
+    pollard_brent_u64 = None
+    pollard_brent_u128 = None
+    pollard_brent_limbs = None
+
+
+def _brent_attempt(n: int, c: int, y: int, max_iterations: int) -> Optional[int]:
+    """
+    One Brent rho run for odd n from constant c and start y
+    """
+    # Word-sized n runs entirely in the compiled kernel when Numba is available
+    if pollard_brent_u64 is not None and n < 1 << 63:
+        return int(pollard_brent_u64(n, c, y, 128, max_iterations)) or None
+    
+    # Below 2^127, two machine words and no array traffic
+    if pollard_brent_u128 is not None and n < 1 << 127:
+        words = [np.uint64(v >> shift & _U64_MASK) for v in (n, c, y) for shift in (64, 0)]
+        g1, g0 = pollard_brent_u128(*words, 128, max_iterations)
+        return (int(g1) << 64 | int(g0)) or None
+    
+    # Up to RHO_LIMBS_MAX_BITS the steps run in the multi-limb kernel
+    if pollard_brent_limbs is not None and n.bit_length() <= RHO_LIMBS_MAX_BITS:
+        return pollard_brent_limbs(n, c, y, 128, max_iterations) or None
+    
+    m = 128  # Steps accumulated into q between gcd calls
+    n = mpz(n)
+    y = mpz(y)
+    g, r, q = 1, 1, mpz(1)
+    
+    while g == 1 and r <= max_iterations:
+        x = y
+        for _ in range(r):
+            y = (y * y + c) % n
+        
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            for _ in range(min(m, r - k)):
+                y = (y * y + c) % n
+                q = (q * abs(x - y)) % n
+            
+            g = gmpy2.gcd(q, n)
+            k += m
+        
+        r *= 2
+    
+    if g == n:
+        # The batch overshot, walk back from ys one step at a time
+        for _ in range(m):
+            ys = (ys * ys + c) % n
+            g = gmpy2.gcd(x - ys, n)
             if g > 1:
-                if g == n:
-                    while True:
-                        ys = (ys * ys + c) % n
-                        g = gcd(abs(x - ys), n)
-                        if g > 1:
-                            break
-                
-                if g < n:
+                break
+    
+    if 1 < g < n:
+        return int(g)
+    return None
+
+
+def make_pool(workers: Optional[int] = None) -> Pool:
+    """
+    Process pool for parallel work; stdout is flushed first, since forked
+    workers inherit its buffer and would re-emit anything still sitting in it
+    """
+    sys.stdout.flush()
+    return Pool(workers)
+
+
+def _brent_task(task: Tuple[int, int, int, int]) -> Optional[int]:
+    """Pool worker for _brent_attempt"""
+    return _brent_attempt(*task)
+
+
+def pollard_rho_brent(n: int, max_iterations: int = 100000, workers: Optional[int] = None) -> Optional[int]:
+    """
+    Brent's improvement to Pollard's rho algorithm
+    Independent (c, y) starts run across `workers` processes (default: one
+    per CPU) for n above word size; the first factor found wins
+    """
+    if n % 2 == 0:
+        return 2
+    
+    if workers is None:
+        workers = cpu_count()
+    # Word-sized n finishes in milliseconds, and daemonic pool workers
+    # cannot spawn children, so those run the starts in turn
+    parallel = workers > 1 and n >= 1 << 63 and not current_process().daemon
+    tasks = [(n, c, random.randint(1, n - 1), max_iterations)
+             for c in range(1, (max(9, workers) if parallel else 9) + 1)]
+    
+    if parallel:
+        with make_pool(workers) as pool:
+            for g in pool.imap_unordered(_brent_task, tasks):
+                if g:
+                    pool.terminate()
                     return g
-            
-            if r > max_iterations:
+        return None
+    
+    for task in tasks:
+        g = _brent_attempt(*task)
+        if g:
+            return g
+    return None
+
+
+@lru_cache(maxsize=None)
+def warmup() -> None:
+    """
+    Compile (or load from Numba's cache) the rho kernels, once per process,
+    so callers can keep JIT time out of their measurements; workers=1 keeps
+    the compilation in this process rather than in throwaway pool children
+    """
+    pollard_rho_brent(8051, workers=1)  # 83 * 97, word-sized kernel
+    pollard_rho_brent(((1 << 61) - 1) * 65537, workers=1)  # 78 bits, two-word kernel
+    pollard_rho_brent(((1 << 127) - 1) * 65537, workers=1)  # 144 bits, multi-limb kernel
+
+
+# Gaps between consecutive integers coprime to 2*3*5*7, starting from 1 -> 11
+WHEEL_DIFFS = (10, 2, 4, 2, 4, 6, 2, 6, 4, 2, 4, 6, 6, 2, 6, 4, 2, 6, 4, 6, 8, 4, 2, 4,
+               2, 4, 8, 6, 4, 6, 2, 4, 6, 2, 6, 6, 4, 2, 4, 6, 2, 6, 4, 2, 4, 2, 10, 2)
+
+
+# Stage 1 bound by expected factor size in bits. With no stage 2 the bounds sit
+# above GMP-ECM's, and 16 pure-Python curves rarely pay off past 48 bits
+ECM_B1_TABLE = ((40, 11000), (48, 50000))
+
+
+def ecm_b1(n: int) -> Optional[int]:
+    """
+    Pick the ECM stage 1 bound for the smaller factor q of a CM number n
+    (about n_bits/3 bits), or None when q is too large for stage 1 to pay off
+    """
+    factor_bits = n.bit_length() // 3
+    for bits, b1 in ECM_B1_TABLE:
+        if factor_bits <= bits:
+            return b1
+    return None
+
+
+def _ladder(k, x, z, n, a24):
+    """Montgomery ladder: x-only k*(x:z) on By^2 = x^3 + Ax^2 + x"""
+    x0, z0 = x, z
+    x1, z1 = x, z
+    # R0 = P, R1 = 2P
+    t1 = (x + z) * (x + z) % n
+    t2 = (x - z) * (x - z) % n
+    t = t1 - t2
+    x2, z2 = t1 * t2 % n, t * (t2 + a24 * t) % n
+    for bit in bin(k)[3:]:
+        # Differential addition R0 + R1 with difference P
+        u = (x1 - z1) * (x2 + z2)
+        v = (x1 + z1) * (x2 - z2)
+        xa, za = z0 * (u + v) ** 2 % n, x0 * (u - v) ** 2 % n
+        if bit == '1':
+            x1, z1 = xa, za
+            t1 = (x2 + z2) * (x2 + z2) % n
+            t2 = (x2 - z2) * (x2 - z2) % n
+            t = t1 - t2
+            x2, z2 = t1 * t2 % n, t * (t2 + a24 * t) % n
+        else:
+            x2, z2 = xa, za
+            t1 = (x1 + z1) * (x1 + z1) % n
+            t2 = (x1 - z1) * (x1 - z1) % n
+            t = t1 - t2
+            x1, z1 = t1 * t2 % n, t * (t2 + a24 * t) % n
+    return x1, z1
+
+
+def ecm_stage1(n: int, B1: int = 50_000, curves: int = 16) -> Optional[int]:
+    """
+    Lenstra ECM, stage 1 only, on Suyama-parametrized Montgomery curves
+    Suyama's curves have group order divisible by 12, which helps smooth orders
+    """
+    if n % 2 == 0:
+        return 2
+    if n < 7:
+        # Too small to draw a Suyama sigma from [6, n - 1]
+        return None
+    
+    n = mpz(n)
+    # Largest prime powers not exceeding B1, computed once for all curves
+    multipliers = []
+    for p in sieve.primerange(2, B1 + 1):
+        q = p
+        while q * p <= B1:
+            q *= p
+        multipliers.append(q)
+    
+    for _ in range(curves):
+        sigma = mpz(random.randint(6, n - 1))
+        u = (sigma * sigma - 5) % n
+        v = 4 * sigma % n
+        x = gmpy2.powmod(u, 3, n)
+        z = gmpy2.powmod(v, 3, n)
+        
+        # (A + 2) / 4 = (v - u)^3 (3u + v) / (16 u^3 v)
+        denominator = 16 * x * v % n
+        g = gmpy2.gcd(denominator, n)
+        if 1 < g < n:
+            return int(g)
+        if g == n:
+            continue
+        a24 = gmpy2.powmod(v - u, 3, n) * (3 * u + v) * gmpy2.invert(denominator, n) % n
+        
+        for k in multipliers:
+            x, z = _ladder(k, x, z, n, a24)
+        
+        g = gmpy2.gcd(z, n)
+        if 1 < g < n:
+            return int(g)
+    
+    return None
+
+
+# Fermat iterations spent when the expected factor gap is out of its reach
+FERMAT_MIN_ITERATIONS = 1000
+
+# Largest V the direct V search will sweep (about 2^v_bits / 10 candidates)
+CM_SIEVE_MAX_V_BITS = 24
+
+
+def cm_sieve_factorization(n: int, D: int, v_bits: int) -> Optional[Tuple[int, int]]:
+    """
+    Search V < 2^v_bits directly for a factor p = (D*V^2+1)/4 of n
+    Only V in the residue classes that keep p free of the sieve primes are
+    tried, since a prime p > 13 never falls in the others
+    """
+    residues = _admissible_v_residues(D)
+    limit = 1 << v_bits
+    n = mpz(n)
+    D_mpz = mpz(D)
+    
+    for base in range(0, limit, V_SIEVE_MODULUS):
+        for r in residues:
+            V = base + r
+            if V >= limit:
                 break
+            p = (D_mpz * V * V + 1) >> 2
+            if not n % p and 1 < p < n:
+                return int(p), int(n // p)
     
     return None
 
@@ -182,11 +843,33 @@ def cm_structure_factorization(n: int, D: int, verbose: bool = False) -> Optiona
     # For the CM construction, we know one factor has the form (D*V^2+1)/4
     # This means 4p - 1 = D*V^2, so V^2 = (4p-1)/D
     
+    # Strategy 0: With V and q of equal size, V has about a third of n's
+    # bits; when that is small, search V directly
+    v_bits = n.bit_length() // 3
+    if v_bits <= CM_SIEVE_MAX_V_BITS:
+        if verbose:
+            print(f"Trying direct V search up to {v_bits} bits...")
+        
+        sieve_result = cm_sieve_factorization(n, D, v_bits)
+        if sieve_result:
+            if verbose:
+                print(f"V search found: {sieve_result[0]} * {sieve_result[1]}")
+            return sieve_result
+    
     # Strategy 1: Try Fermat factorization first (good if factors are close)
+    # Fermat needs about gap^2 / (8*sqrt(n)) steps; with the expected shape
+    # p ~ D*2^(2*v_bits)/4, q ~ 2^v_bits that is usually far out of reach, so
+    # only a short burst for genuinely close factors is spent then
+    gap_est = abs((D << (2 * v_bits)) // 4 - (1 << v_bits))
+    fermat_steps_est = gap_est * gap_est // (8 * isqrt(n) + 1)
+    fermat_iterations = 50000 if fermat_steps_est <= 50000 else FERMAT_MIN_ITERATIONS
+    
     if verbose:
-        print("Trying Fermat factorization...")
+        print(f"Trying Fermat factorization ({fermat_iterations} iterations)...")
     
-    fermat_result = fermat_factorization(n, 50000)
+    # The CM construction uses V and q of equal size, so q carries about a
+    # third of n's bits and p the rest
+    fermat_result = fermat_factorization(n, fermat_iterations, q_bits_estimate=v_bits)
     if fermat_result:
         p, q = fermat_result
         if verbose:
@@ -205,7 +888,20 @@ def cm_structure_factorization(n: int, D: int, verbose: bool = False) -> Optiona
         
         return p, q  # Valid factorization even if not CM structure
     
-    # Strategy 2: Pollard's rho with Brent's improvement
+    # Strategy 2: ECM stage 1 (cost depends on the factor size, not on n)
+    B1 = ecm_b1(n)
+    if B1 is not None:
+        if verbose:
+            print(f"Trying ECM stage 1 with B1={B1}...")
+        
+        factor = ecm_stage1(n, B1)
+        if factor:
+            other_factor = n // factor
+            if verbose:
+                print(f"ECM found: {factor} * {other_factor}")
+            return factor, other_factor
+    
+    # Strategy 3: Pollard's rho with Brent's improvement
     if verbose:
         print("Trying Pollard's rho (Brent)...")
     
@@ -216,28 +912,45 @@ def cm_structure_factorization(n: int, D: int, verbose: bool = False) -> Optiona
             print(f"Pollard's rho found: {factor} * {other_factor}")
         return factor, other_factor
     
-    # Strategy 3: Trial division with small primes
+    # Strategy 4: Trial division with small primes
     if verbose:
         print("Trying trial division...")
     
-    small_primes = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97]
-    for p in small_primes:
-        if n % p == 0:
-            return p, n // p
+    # A single gcd against the primes below 100; only on a hit are they
+    # walked to pick out the smallest one
+    g = math.gcd(n, PRIMORIAL_100)
+    if g > 1:
+        for p in sieve.primerange(2, 100):
+            if g % p == 0:
+                return p, n // p
     
-    # Strategy 4: Extended trial division
-    limit = min(100000, int(math.sqrt(n)) + 1)
-    for i in range(101, limit, 2):
+    # Strategy 5: Extended trial division
+    # Candidates coprime to 210 only; the wheel is resumed at 101, the first
+    # spoke past the small primes above
+    limit = min(100000, isqrt(n) + 1)
+    i = 97
+    for d in islice(cycle(WHEEL_DIFFS), 21, None):
+        i += d
+        if i >= limit:
+            break
         if n % i == 0:
             return i, n // i
     
     return None
 
 
-def validate_cm_construction(p: int, D: int, verbose: bool = False) -> Optional[int]:
+def validate_cm_construction(p: int, D: int, verbose: bool = False, assume_v: Optional[int] = None) -> Optional[int]:
     """
     Check if p has the form (D*V^2+1)/4 and return V if so
+    With assume_v, only check that V = assume_v reproduces p (no square root)
     """
+    if assume_v is not None:
+        if assume_v % 2 == 1 and (D * assume_v * assume_v + 1) // 4 == p:
+            if verbose:
+                print(f"Validated: p = {p} = (D*{assume_v}^2+1)/4 with D={D}")
+            return assume_v
+        return None
+    
     temp = 4 * p - 1
     if temp % D != 0:
         return None
@@ -276,22 +989,19 @@ def comprehensive_cm_factorization(n: int, D: int, verbose: bool = False) -> Opt
     if result:
         p, q = result
         
-        # Check which factor (if any) has CM structure
-        v_p = validate_cm_construction(p, D, verbose)
-        v_q = validate_cm_construction(q, D, verbose)
+        # Check which factor (if any) has CM structure. With V and q of equal
+        # size the CM factor is the larger one, so try it first and only fall
+        # back to the other when it fails
+        for cm_factor, other in sorted([(p, q), (q, p)], reverse=True):
+            v = validate_cm_construction(cm_factor, D, verbose)
+            if v is not None:
+                if verbose:
+                    print(f"Factor {cm_factor} has CM structure with V={v}")
+                return cm_factor, other, v  # Return CM factor first
         
-        if v_p is not None:
-            if verbose:
-                print(f"Factor p={p} has CM structure with V={v_p}")
-            return p, q, v_p
-        elif v_q is not None:
-            if verbose:
-                print(f"Factor q={q} has CM structure with V={v_q}")
-            return q, p, v_q  # Return CM factor first
-        else:
-            if verbose:
-                print("Found factorization but no CM structure detected")
-            return p, q, None
+        if verbose:
+            print("Found factorization but no CM structure detected")
+        return p, q, None
     
     end_time = time.time()
     if verbose:
@@ -300,6 +1010,78 @@ def comprehensive_cm_factorization(n: int, D: int, verbose: bool = False) -> Opt
     return None
 
 
+def _seeded_factor(task: Tuple[int, int, int, bool]) -> Optional[Tuple[int, int, Optional[int]]]:
+    """
+    Pool worker: reseed the RNG so each process walks different rho sequences
+    """
+    seed, n, D, verbose = task
+    random.seed(os.getpid() ^ seed)
+    return comprehensive_cm_factorization(n, D, verbose)
+
+
+def parallel_factor(n: int, D: int, verbose: bool = False, workers: Optional[int] = None) -> Optional[Tuple[int, int, Optional[int]]]:
+    """
+    Race comprehensive_cm_factorization over differently seeded processes
+    The first non-None result wins and the remaining workers are terminated
+    """
+    if workers is None:
+        workers = cpu_count()
+    
+    # Daemonic pool workers cannot spawn children, so callers that already
+    # run inside a pool factor in-process
+    if workers <= 1 or current_process().daemon:
+        return comprehensive_cm_factorization(n, D, verbose)
+    
+    # Only the first worker reports progress, to keep the output readable
+    tasks = [(seed, n, D, verbose and seed == 0) for seed in range(workers)]
+    
+    with make_pool(workers) as pool:
+        for result in pool.imap_unordered(_seeded_factor, tasks):
+            if result is not None:
+                pool.terminate()
+                return result
+    
+    return None
+
+
+class TrialStatus(IntEnum):
+    """Outcome of one construct-and-factor trial"""
+    SUCCESS = 0
+    PARTIAL = 1
+    FAILED = 2
+    ERROR = 3
+
+
+def run_trial(bits: int, D: int, seed: int) -> Tuple[int, Optional[float], Optional[float], TrialStatus]:
+    """
+    Construct and factor one bits-sized CM number, for use in a process pool
+    Returns (bits, construction time, factorization time, status)
+    The construction is seeded but bypasses cached_construct, so it is timed
+    for real rather than as a cache hit inherited from the parent
+    """
+    try:
+        # Construction
+        start_time = time.perf_counter_ns()
+        n, p, q, V = construct_cm_number(D, bits, bits, randfunc=random.Random(seed).randbytes)
+        construct_time = (time.perf_counter_ns() - start_time) / 1e9
+        
+        # Factorization
+        start_time = time.perf_counter_ns()
+        result = parallel_factor(n, D, verbose=False)
+        factor_time = (time.perf_counter_ns() - start_time) / 1e9
+        
+        if result:
+            fp, fq, recovered_v = result
+            status = TrialStatus.SUCCESS if fp * fq == n else TrialStatus.PARTIAL
+        else:
+            status = TrialStatus.FAILED
+        
+        return bits, construct_time, factor_time, status
+        
+    except Exception:
+        return bits, None, None, TrialStatus.ERROR
+
+
 def main():
     parser = argparse.ArgumentParser(description='Efficient CM Factorization')
     parser.add_argument('--action', choices=['construct', 'factor', 'demo', 'benchmark'], 